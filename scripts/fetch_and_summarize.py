@@ -6,14 +6,21 @@ generates summaries + categories using Claude, and writes articles.json.
 Run daily via GitHub Actions.
 """
 
-import json
+import asyncio
 import os
+import random
+import re
+import sqlite3
 import sys
 import time
 from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit, urlunsplit
 
 import anthropic
-import requests
+import httpx
+import ijson
+import orjson
+from datasketch import MinHash, MinHashLSH
 
 DEVTO_API = "https://dev.to/api/articles"
 HN_API    = "https://hn.algolia.com/api/v1/search"
@@ -29,88 +36,231 @@ FETCH_BUCKETS = [
 ]
 
 MAX_ARTICLES = 60   # cap before summarization
-BATCH_SIZE   = 15   # articles per Claude call
+MIN_POINTS_HN    = 5   # drop low-signal stories before dedup / summarization
+MIN_POINTS_DEVTO = 1
+BATCH_SIZE   = 30   # articles per Claude call
+FALLBACK_BATCH_SIZE = 15    # retry size for articles a full batch left unsummarised
+MAX_TOKENS          = 8192  # output budget per Claude call
+MAX_CONCURRENT_BATCHES = 4  # Claude calls in flight at once
+CLAUDE_RETRIES         = 4  # attempts per batch on 429 / 5xx / connection errors
+RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+
+# Summaries already produced on earlier runs, keyed by article id
+CACHE_PATH     = os.path.join(os.path.dirname(__file__), "summaries.db")
+CACHE_TTL_DAYS = 30
+
+WARMUP_TIMEOUT = 5  # seconds to spend pre-connecting to the Anthropic API
+
+# Account rate limits for the summarisation model: requests and input tokens
+# per minute. Set CLAUDE_RPM / CLAUDE_TPM to the account's actual tier limits.
+CLAUDE_RPM = int(os.environ.get("CLAUDE_RPM") or 50)
+CLAUDE_TPM = int(os.environ.get("CLAUDE_TPM") or 50_000)
+
+# Fail fast on dead hosts: 3s to connect, 10s for each read/write
+FETCH_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+FETCH_LIMITS  = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+FETCH_RETRIES = 2   # extra attempts on 429 / 5xx / connection errors
+FETCH_BACKOFF = 0.3
+FETCH_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Near-duplicate title detection (MinHash over character 3-gram shingles)
+MINHASH_PERM      = 64
+MINHASH_THRESHOLD = 0.8
 
 
 # ── Fetchers ──────────────────────────────────────────────────────────────────
 
-def fetch_devto(tags, per_page=20):
-    results = []
-    seen = set()
-    for tag in tags:
+async def get_json(session, url):
+    for attempt in range(FETCH_RETRIES + 1):
         try:
-            r = requests.get(
-                f"{DEVTO_API}?tag={tag}&per_page={per_page}&top=7",
-                timeout=15
-            )
+            r = await session.get(url)
+            if r.status_code in FETCH_RETRY_STATUS and attempt < FETCH_RETRIES:
+                await asyncio.sleep(FETCH_BACKOFF * 2 ** attempt)
+                continue
             r.raise_for_status()
-            for a in r.json():
-                if a.get("id") and a.get("title") and a["id"] not in seen:
-                    seen.add(a["id"])
-                    results.append({
-                        "id":           f"devto-{a['id']}",
-                        "title":        a["title"].strip(),
-                        "description":  (a.get("description") or "")[:400].strip(),
-                        "url":          a.get("url", ""),
-                        "source":       "dev.to",
-                        "points":       a.get("positive_reactions_count", 0),
-                        "comments":     a.get("comments_count", 0),
-                        "published_at": a.get("published_at", ""),
-                    })
-        except Exception as e:
-            print(f"  [warn] Dev.to tag={tag}: {e}", file=sys.stderr)
-    return results
+            return orjson.loads(r.content)
+        except httpx.TransportError:
+            if attempt == FETCH_RETRIES:
+                raise
+            await asyncio.sleep(FETCH_BACKOFF * 2 ** attempt)
 
 
-def fetch_hn(query, hits=20):
+async def fetch_devto(session, tag, per_page=20):
     try:
-        r = requests.get(
-            f"{HN_API}?query={requests.utils.quote(query)}&tags=story&hitsPerPage={hits}",
-            timeout=15
-        )
-        r.raise_for_status()
+        data = await get_json(session, f"{DEVTO_API}?tag={tag}&per_page={per_page}&top=7")
         results = []
-        for h in r.json().get("hits", []):
-            if not h.get("title"):
-                continue
-            url = h.get("url") or f"https://news.ycombinator.com/item?id={h['objectID']}"
-            try:
-                source = url.split("/")[2].replace("www.", "")
-            except Exception:
-                source = "news.ycombinator.com"
-            results.append({
-                "id":           f"hn-{h['objectID']}",
-                "title":        h["title"].strip(),
-                "description":  "",
-                "url":          url,
-                "source":       source,
-                "points":       h.get("points", 0),
-                "comments":     h.get("num_comments", 0),
-                "published_at": h.get("created_at", ""),
-            })
+        for a in data:
+            if a.get("id") and a.get("title"):
+                results.append({
+                    "id":           f"devto-{a['id']}",
+                    "title":        a["title"].strip(),
+                    "description":  (a.get("description") or "")[:200].strip(),
+                    "url":          a.get("url", ""),
+                    "source":       "dev.to",
+                    "points":       a.get("positive_reactions_count", 0),
+                    "comments":     a.get("comments_count", 0),
+                    "published_at": a.get("published_at", ""),
+                })
         return results
     except Exception as e:
-        print(f"  [warn] HN query='{query}': {e}", file=sys.stderr)
+        print(f"  [warn] Dev.to tag={tag}: {e}", file=sys.stderr)
         return []
 
 
+async def fetch_hn(session, queries, hits=20):
+    """Run every HN query together and merge hits by story id.
+
+    The public HN Algolia API has no multi-query endpoint, so the queries go out
+    concurrently on the shared connection and overlapping stories are collapsed
+    here rather than in deduplicate().
+    """
+    async def search(query):
+        try:
+            data = await get_json(session, f"{HN_API}?query={quote(query)}&tags=story&hitsPerPage={hits}")
+            return data.get("hits", [])
+        except Exception as e:
+            print(f"  [warn] HN query='{query}': {e}", file=sys.stderr)
+            return []
+
+    stories = {}
+    for hit_list in await asyncio.gather(*[search(q) for q in queries]):
+        for h in hit_list:
+            if h.get("title"):
+                stories.setdefault(h["objectID"], h)
+
+    results = []
+    for h in stories.values():
+        url = h.get("url") or f"https://news.ycombinator.com/item?id={h['objectID']}"
+        try:
+            source = url.split("/")[2].replace("www.", "")
+        except Exception:
+            source = "news.ycombinator.com"
+        results.append({
+            "id":           f"hn-{h['objectID']}",
+            "title":        h["title"].strip(),
+            "description":  "",
+            "url":          url,
+            "source":       source,
+            "points":       h.get("points", 0),
+            "comments":     h.get("num_comments", 0),
+            "published_at": h.get("created_at", ""),
+        })
+    return results
+
+
+async def fetch_all():
+    """Fetch every Dev.to tag and HN query concurrently over one pooled client.
+
+    HTTP/2 lets the concurrent requests to each host share a single connection.
+    """
+    async with httpx.AsyncClient(http2=True, limits=FETCH_LIMITS, timeout=FETCH_TIMEOUT) as session:
+        tasks = [
+            fetch_devto(session, tag, per_page=15)
+            for bucket in FETCH_BUCKETS for tag in bucket["devto"]
+        ]
+        tasks.append(fetch_hn(session, [bucket["hn"] for bucket in FETCH_BUCKETS], hits=15))
+        batches = await asyncio.gather(*tasks)
+    return [a for batch in batches for a in batch]
+
+
+def title_minhash(title):
+    text = " ".join(re.findall(r"\w+", title.lower()))
+    # Too short to shingle (e.g. punctuation/emoji-only titles): exact keys only
+    if len(text) < 3:
+        return None
+    mh   = MinHash(num_perm=MINHASH_PERM)
+    for i in range(len(text) - 2):
+        mh.update(text[i:i + 3].encode("utf-8"))
+    return mh
+
+
+def canon(url):
+    """Normalise a URL for duplicate detection (http→https, drop utm_* params, www., trailing /)."""
+    try:
+        p = urlsplit(url)
+    except ValueError:
+        return url
+    q = "&".join(kv for kv in p.query.split("&") if kv and not kv.startswith("utm_"))
+    # http and https copies of the same page are the same article
+    scheme = "https" if p.scheme.lower() == "http" else p.scheme.lower()
+    return urlunsplit((scheme, p.netloc.lower().removeprefix("www."), p.path.rstrip("/"), q, ""))
+
+
 def deduplicate(articles):
-    seen_ids     = set()
-    seen_titles  = set()
-    result       = []
+    # ids, title prefixes and canonical URLs share one set; an article is kept
+    # only if none of its keys has been seen and no kept title is a near-duplicate
+    seen   = set()
+    lsh    = MinHashLSH(threshold=MINHASH_THRESHOLD, num_perm=MINHASH_PERM)
+    result = []
     for a in articles:
-        title_key = a["title"].lower()[:60]
-        if a["id"] not in seen_ids and title_key not in seen_titles:
-            seen_ids.add(a["id"])
-            seen_titles.add(title_key)
-            result.append(a)
+        keys = (a["id"], a["title"][:60].lower())
+        if a.get("url"):
+            keys += (canon(a["url"]),)
+        if not seen.isdisjoint(keys):
+            continue
+        mh = title_minhash(a["title"])
+        if mh is not None and lsh.query(mh):
+            continue
+        seen.update(keys)
+        if mh is not None:
+            lsh.insert(a["id"], mh)
+        result.append(a)
     return result
 
 
 # ── Summarisation ─────────────────────────────────────────────────────────────
 
 SYSTEM_PROMPT = """You are an expert AI news editor. Your job is to write concise,
-insightful summaries of AI news articles for a tech-savvy audience."""
+insightful summaries of AI news articles for a tech-savvy audience.
+
+Each request lists numbered articles. Summarise every one of them and record the
+results with emit_summaries, one entry per article with its [n] number as index."""
+
+# The system prompt and tool schema are identical for every batch, so mark them
+# for Anthropic's prompt cache
+SYSTEM_BLOCKS = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+CATEGORIES = ["llm", "research", "openai", "google", "robotics", "opensource", "funding", "all"]
+TAGS       = ["LLM", "Research", "Open Source", "Robotics", "Image/Video", "Safety",
+              "Funding", "Acquisition", "Business", "Agent"]
+
+# Forcing this tool makes Claude return validated structured input instead of
+# free-form JSON text that has to be fence-stripped and parsed
+SUMMARY_TOOL = {
+    "name":        "emit_summaries",
+    "description": "Record one summary per article, tagged with the article's index.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "summaries": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {
+                            "type":        "integer",
+                            "description": "The article's [n] number from the list.",
+                        },
+                        "summary": {
+                            "type":        "string",
+                            "description": "2-3 sentences. Sentence 1: what happened. "
+                                           "Sentences 2-3: why it matters / implications.",
+                        },
+                        "category": {"type": "string", "enum": CATEGORIES},
+                        "tags": {
+                            "type":     "array",
+                            "items":    {"type": "string", "enum": TAGS},
+                            "minItems": 1,
+                            "maxItems": 3,
+                        },
+                    },
+                    "required": ["index", "summary", "category", "tags"],
+                },
+            },
+        },
+        "required": ["summaries"],
+    },
+}
 
 def build_user_prompt(articles):
     lines = []
@@ -120,88 +270,281 @@ def build_user_prompt(articles):
             entry += f"\n    Info: {a['description']}"
         lines.append(entry)
 
-    return f"""\
-Summarise each of the {len(articles)} AI news articles below.
-
-Return ONLY a valid JSON array (no markdown, no extra text) with one object per article:
-{{
-  "summary":  "2-3 sentences. Sentence 1: what happened. Sentences 2-3: why it matters / implications.",
-  "category": one of: llm | research | openai | google | robotics | opensource | funding | all,
-  "tags":     array of 1-3 strings from: LLM | Research | Open Source | Robotics | Image/Video | Safety | Funding | Acquisition | Business | Agent
-}}
-
-Articles:
-{chr(10).join(lines)}"""
+    return f"Articles ({len(articles)}):\n" + "\n".join(lines)
+
+
+class TokenBucket:
+    """Pro-active limiter for a requests-per-minute and input-tokens-per-minute budget.
+
+    Callers only block when the bucket is empty, so throughput tracks the real
+    rate limit instead of a fixed sleep between calls.
+    """
+
+    def __init__(self, rpm, tpm):
+        self.rpm           = rpm
+        self.tpm           = tpm
+        self.requests      = float(rpm)
+        self.tokens        = float(tpm)
+        self.updated       = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock          = asyncio.Lock()
+
+    def _refill(self, now):
+        elapsed       = now - self.updated
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens   = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        self.updated  = now
+
+    async def acquire(self, tokens):
+        tokens = min(tokens, self.tpm)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.requests >= 1 and self.tokens >= tokens:
+                    self.requests -= 1
+                    self.tokens   -= tokens
+                    return
+                await asyncio.sleep(max(
+                    (1 - self.requests) * 60 / self.rpm,
+                    (tokens - self.tokens) * 60 / self.tpm,
+                ))
+
+    def penalize(self, seconds):
+        """Hold every caller back for `seconds` (e.g. after a 429 retry-after)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _retry_after(e):
+    try:
+        return float(e.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _is_retryable(e):
+    if isinstance(e, anthropic.APIConnectionError):
+        return True
+    return isinstance(e, anthropic.APIStatusError) and e.status_code in RETRY_STATUS
+
+
+async def summarise_batch(articles, client, sem, bucket):
+    """Yield each article's summary as soon as it has streamed in.
+
+    The tool input is parsed incrementally, so entries that arrived before a
+    truncated or failed response are still delivered.
+    """
+    prompt     = build_user_prompt(articles)
+    # Rough input estimate (~4 chars per token) is enough to stay under the
+    # input-token budget; output tokens are limited separately by the API
+    est_tokens = (len(SYSTEM_PROMPT) + len(prompt)) // 4
+    emitted    = 0
+    async with sem:
+        for attempt in range(CLAUDE_RETRIES):
+            await bucket.acquire(est_tokens)
+            try:
+                items  = ijson.sendable_list()
+                parser = ijson.items_coro(items, "summaries.item")
+                # Stream so generation overlaps with network reads and parsing
+                async with client.messages.stream(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=MAX_TOKENS,
+                    system=SYSTEM_BLOCKS,
+                    tools=[SUMMARY_TOOL],
+                    tool_choice={"type": "tool", "name": SUMMARY_TOOL["name"]},
+                    messages=[{"role": "user", "content": prompt}],
+                ) as stream:
+                    async for event in stream:
+                        if event.type != "input_json":
+                            continue
+                        parser.send(event.partial_json.encode("utf-8"))
+                        for item in items:
+                            emitted += 1
+                            yield item
+                        del items[:]
+                parser.close()
+                return
+            except anthropic.APIError as e:
+                # Once summaries have been handed out a retry would duplicate them
+                if emitted or attempt == CLAUDE_RETRIES - 1 or not _is_retryable(e):
+                    raise
+                # Honour retry-after on 429 for every caller; otherwise back off
+                # exponentially with jitter: ~1s, 2s, 4s…
+                delay = _retry_after(e) if isinstance(e, anthropic.RateLimitError) else None
+                if delay is not None:
+                    bucket.penalize(delay)
+                else:
+                    await asyncio.sleep(2 ** attempt + random.random())
+
+
+def _apply_summary(article, meta):
+    article["summary"]  = meta.get("summary", "")
+    article["category"] = meta.get("category", "all")
+    article["tags"]     = meta.get("tags", [])
+
+
+async def summarise_into(batch, client, sem, bucket):
+    """Attach summaries to `batch` in place as they stream in.
+
+    Summaries are matched to articles by their `index` field rather than by
+    position, so a skipped or reordered entry can't shift the rest. Returns
+    the articles whose index appeared exactly once, i.e. whose summary is
+    known to belong to them and is safe to cache.
+    """
+    pending = dict(enumerate(batch))
+    matched = {}
+    repeats = set()
+    error   = None
+    try:
+        async for meta in summarise_batch(batch, client, sem, bucket):
+            index   = meta.get("index")
+            article = pending.pop(index, None)
+            if article is not None:
+                _apply_summary(article, meta)
+                matched[index] = article
+            elif index in matched:
+                repeats.add(index)
+    except Exception as e:
+        error = e
+        print(f"  [warn] Summarisation batch of {len(batch)} failed "
+              f"after {len(batch) - len(pending)} summaries: {e}", file=sys.stderr)
+
+    verified = [a for i, a in matched.items() if i not in repeats]
+
+    # Smaller batches only help when the response came back short or truncated;
+    # an API error that exhausted its retries (auth, 429, 529…) would just repeat
+    missing = list(pending.values())
+    short   = error is None or len(missing) < len(batch) or not isinstance(error, anthropic.APIError)
+    if missing and short and len(batch) > FALLBACK_BATCH_SIZE:
+        # A large batch came back short (e.g. hit max_tokens); redo the rest in smaller ones
+        print(f"  Retrying {len(missing)} unsummarised articles in batches of {FALLBACK_BATCH_SIZE}…")
+        retried = await asyncio.gather(*[
+            summarise_into(missing[i:i + FALLBACK_BATCH_SIZE], client, sem, bucket)
+            for i in range(0, len(missing), FALLBACK_BATCH_SIZE)
+        ])
+        return verified + [a for chunk in retried for a in chunk]
+    for article in missing:
+        _apply_summary(article, {})
+    return verified
+
+
+async def attach_summaries(articles, client):
+    """Summarise `articles` in place; return those whose summaries are safe to cache."""
+    total  = len(articles)
+    sem    = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+    bucket = TokenBucket(CLAUDE_RPM, CLAUDE_TPM)
+    starts = range(0, total, BATCH_SIZE)
+
+    print(f"  Summarising {total} articles in {len(starts)} batches…")
+    verified = await asyncio.gather(*[
+        summarise_into(articles[i:i + BATCH_SIZE], client, sem, bucket) for i in starts
+    ])
+    return [a for chunk in verified for a in chunk]
+
+
+# ── Summary cache ─────────────────────────────────────────────────────────────
+
+def open_cache(path=CACHE_PATH):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS summaries (
+            id        TEXT PRIMARY KEY,
+            summary   TEXT NOT NULL,
+            category  TEXT NOT NULL,
+            tags      TEXT NOT NULL,
+            cached_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )""")
+    # Commit the prune now; store_summaries only runs when there are misses
+    with conn:
+        conn.execute(
+            "DELETE FROM summaries WHERE cached_at < datetime('now', ?)",
+            (f"-{CACHE_TTL_DAYS} days",),
+        )
+    return conn
 
 
-def summarise_batch(articles, client):
-    prompt = build_user_prompt(articles)
-    resp = client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=4096,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": prompt}],
+def apply_cached(articles, conn):
+    """Fill in cached summaries in place; return the articles that still need one."""
+    misses = []
+    for a in articles:
+        row = conn.execute(
+            "SELECT summary, category, tags FROM summaries WHERE id = ?", (a["id"],)
+        ).fetchone()
+        if row:
+            a["summary"], a["category"] = row[0], row[1]
+            a["tags"] = orjson.loads(row[2])
+        else:
+            misses.append(a)
+    return misses
+
+
+def store_summaries(articles, conn):
+    # Only pass articles whose summary was matched by index (see summarise_into);
+    # failed batches leave an empty summary, which is never cached
+    conn.executemany(
+        "INSERT OR REPLACE INTO summaries (id, summary, category, tags) VALUES (?, ?, ?, ?)",
+        [(a["id"], a["summary"], a["category"], orjson.dumps(a["tags"]).decode())
+         for a in articles if a.get("summary")],
     )
-    raw = resp.content[0].text.strip()
+    conn.commit()
 
-    # Strip markdown fences if Claude wraps the JSON
-    if raw.startswith("```"):
-        raw = raw.split("```", 2)[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-    raw = raw.strip()
 
-    return json.loads(raw)
+# ── Output ────────────────────────────────────────────────────────────────────
 
+def write_articles(path, updated_at, articles):
+    """Write articles.json one article at a time.
 
-def attach_summaries(articles, client):
-    enriched = []
-    total    = len(articles)
-
-    for start in range(0, total, BATCH_SIZE):
-        batch = articles[start:start + BATCH_SIZE]
-        end   = start + len(batch)
-        print(f"  Summarising articles {start + 1}–{end} of {total}…")
-
-        try:
-            results = summarise_batch(batch, client)
-            for j, article in enumerate(batch):
-                meta = results[j] if j < len(results) else {}
-                article["summary"]  = meta.get("summary", "")
-                article["category"] = meta.get("category", "all")
-                article["tags"]     = meta.get("tags", [])
-                enriched.append(article)
-        except Exception as e:
-            print(f"  [warn] Summarisation batch {start}–{end} failed: {e}", file=sys.stderr)
-            for article in batch:
-                article["summary"]  = ""
-                article["category"] = "all"
-                article["tags"]     = []
-                enriched.append(article)
+    Only a single serialised article is held in memory at once; the layout
+    matches a two-space-indented dump of the whole document.
+    """
+    with open(path, "wb") as f:
+        f.write(b'{\n  "updated_at": ' + orjson.dumps(updated_at))
+        f.write(b',\n  "count": ' + orjson.dumps(len(articles)))
+        f.write(b',\n  "articles": [')
+        for i, a in enumerate(articles):
+            f.write(b",\n    " if i else b"\n    ")
+            # JSON strings never contain raw newlines, so re-indenting is safe
+            f.write(orjson.dumps(a, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n    "))
+        f.write(b"\n  ]\n}" if articles else b"]\n}")
 
-        # Brief pause between batches to be polite to the API
-        if end < total:
-            time.sleep(1)
 
-    return enriched
+# ── Main ──────────────────────────────────────────────────────────────────────
 
+async def warm_connection(client):
+    """Open the TLS connection to the Anthropic API ahead of the first batch."""
+    try:
+        await client.models.list(limit=1, timeout=WARMUP_TIMEOUT)
+    except Exception:
+        # Best effort only; the first batch simply connects on its own
+        pass
 
-# ── Main ──────────────────────────────────────────────────────────────────────
 
-def main():
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        print("ERROR: ANTHROPIC_API_KEY environment variable is not set.", file=sys.stderr)
-        sys.exit(1)
+async def run(api_key):
+    # Retries are handled per batch in summarise_batch
+    async with anthropic.AsyncAnthropic(api_key=api_key, max_retries=0) as client:
+        # Handshake with the Anthropic API while the fetch phase is in flight
+        warmup = asyncio.create_task(warm_connection(client))
+        try:
+            return await collect_and_summarise(client, warmup)
+        finally:
+            warmup.cancel()
+            try:
+                await warmup
+            except asyncio.CancelledError:
+                pass
 
-    client = anthropic.Anthropic(api_key=api_key)
 
+async def collect_and_summarise(client, warmup):
     # 1. Fetch
     print("Fetching articles…")
-    raw = []
-    for bucket in FETCH_BUCKETS:
-        raw.extend(fetch_devto(bucket["devto"], per_page=15))
-        raw.extend(fetch_hn(bucket["hn"], hits=15))
+    raw = await fetch_all()
+    raw = [
+        a for a in raw
+        if (a.get("points") or 0) >= (MIN_POINTS_DEVTO if a["id"].startswith("devto-") else MIN_POINTS_HN)
+    ]
 
     articles = deduplicate(raw)
     articles.sort(key=lambda a: a.get("points", 0), reverse=True)
@@ -209,19 +552,33 @@ def main():
     print(f"Collected {len(articles)} unique articles.")
 
     # 2. Summarise
-    print("Generating summaries with Claude…")
-    articles = attach_summaries(articles, client)
+    cache = open_cache()
+    try:
+        to_summarize = apply_cached(articles, cache)
+        print(f"Reusing {len(articles) - len(to_summarize)} cached summaries.")
+        if to_summarize:
+            # Give a slow warm-up a few seconds at most; run() cancels it if still pending
+            await asyncio.wait([warmup], timeout=WARMUP_TIMEOUT)
+            print("Generating summaries with Claude…")
+            store_summaries(await attach_summaries(to_summarize, client), cache)
+    finally:
+        cache.close()
+
+    return articles
+
+
+def main():
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("ERROR: ANTHROPIC_API_KEY environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+
+    articles = asyncio.run(run(api_key))
 
     # 3. Write output
-    output = {
-        "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "count":      len(articles),
-        "articles":   articles,
-    }
-
-    out_path = os.path.join(os.path.dirname(__file__), "..", "articles.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    updated_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    out_path   = os.path.join(os.path.dirname(__file__), "..", "articles.json")
+    write_articles(out_path, updated_at, articles)
 
     print(f"Done. Wrote {len(articles)} articles to articles.json.")
 